@@ -1,4 +1,29 @@
+import asyncio
+import os
+import sys
+import warnings
+
 from .core import LeanPrompt
 from .guard import Guard
 
+# Opt-in: LEANPROMPT_UVLOOP=1 switches asyncio to uvloop's C event loop when
+# it is installed (`pip install leanprompt[fast]`). Uvicorn already picks
+# uvloop on its own; this covers other servers and scripts. Event loop
+# policies are deprecated from Python 3.14, where `uvloop.run()` or the
+# server's loop option should be used instead.
+if os.getenv("LEANPROMPT_UVLOOP", "").lower() in ("1", "true", "yes"):
+    if sys.version_info >= (3, 14):
+        warnings.warn(
+            "LEANPROMPT_UVLOOP is ignored on Python 3.14+; "
+            "use uvloop.run() or your server's loop option instead",
+            RuntimeWarning,
+        )
+    else:
+        try:
+            import uvloop
+        except ImportError:
+            pass
+        else:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
 __all__ = ["LeanPrompt", "Guard"]
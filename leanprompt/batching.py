@@ -0,0 +1,164 @@
+import asyncio
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .providers.base import BaseProvider
+
+
+class DynBatcher:
+    """Coalesces concurrent `provider.generate` calls into small batches.
+
+    Requests submitted within `max_delay` seconds of each other (up to
+    `max_batch_size`) are dispatched together: identical requests share a single
+    provider call (unless submitted with `dedupe=False`), requests with the same
+    system prompt and model are sent back to back (same prefix -> best
+    server-side cache reuse), and at most `max_concurrency` provider calls are
+    in flight at any time.
+    """
+
+    def __init__(
+        self,
+        provider: BaseProvider,
+        max_batch_size: int = 8,
+        max_delay: float = 0.05,
+        max_concurrency: int = 32,
+    ):
+        self.provider = provider
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_concurrency = max_concurrency
+
+        # Loop-bound state, created lazily on first submit
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        # In-flight dispatch task -> its batch. Holds a strong reference (the
+        # loop only keeps weak ones) and lets aclose() fail unfinished futures.
+        self._dispatches: Dict[asyncio.Task, list] = {}
+
+    async def submit(
+        self,
+        system_prompt: str,
+        user_input: str,
+        history: List[Dict[str, str]],
+        kwargs: Dict[str, Any],
+        dedupe: bool = True,  # False for stochastic routes: never share a call
+    ) -> str:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._worker = loop.create_task(self._run())
+
+        future = loop.create_future()
+        request = (system_prompt, user_input, list(history), dict(kwargs))
+        await self._queue.put((request, future, dedupe))
+        return await future
+
+    async def aclose(self):
+        """Stops the worker and fails every request that has not completed."""
+        worker, self._worker = self._worker, None
+        dispatches = list(self._dispatches.items())
+        self._dispatches.clear()
+        if self._loop is not asyncio.get_running_loop():
+            # Loop-bound state from another (finished) loop: nothing to await
+            return
+
+        tasks = [task for task, _ in dispatches]
+        if worker is not None:
+            tasks.append(worker)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for _, batch in dispatches:
+            self._fail(batch)
+        queued = []
+        while not self._queue.empty():
+            queued.append(self._queue.get_nowait())
+        self._fail(queued)
+
+    @staticmethod
+    def _fail(batch: Iterable[tuple]):
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("DynBatcher is closed"))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.max_delay
+
+                # Fill the batch until it is full or the delay window closes
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                # Dispatch without blocking collection of the next batch
+                task = loop.create_task(self._dispatch(batch))
+                self._dispatches[task] = batch
+                task.add_done_callback(self._forget_dispatch)
+                batch = []
+        except asyncio.CancelledError:
+            # Requests collected into a batch that was never dispatched
+            self._fail(batch)
+            raise
+
+    def _forget_dispatch(self, task: asyncio.Task):
+        self._dispatches.pop(task, None)
+
+    async def _dispatch(self, batch: List[Tuple[tuple, asyncio.Future, bool]]):
+        # Group identical requests so each is only sent once
+        groups: Dict[Any, Tuple[tuple, List[asyncio.Future]]] = {}
+        for request, future, dedupe in batch:
+            key = self._key(request) if dedupe else future
+            if key in groups:
+                groups[key][1].append(future)
+            else:
+                groups[key] = (request, [future])
+
+        # Order by (system_prompt, model) so shared prefixes go out together
+        ordered = sorted(
+            groups.values(),
+            key=lambda g: (g[0][0], str(g[0][3].get("model", ""))),
+        )
+        await asyncio.gather(*(self._call(req, futs) for req, futs in ordered))
+
+    async def _call(self, request: tuple, futures: List[asyncio.Future]):
+        system_prompt, user_input, history, kwargs = request
+        try:
+            async with self._semaphore:
+                result = await self.provider.generate(
+                    system_prompt=system_prompt,
+                    user_input=user_input,
+                    history=history,
+                    **kwargs,
+                )
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future in futures:
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _key(request: tuple) -> tuple:
+        system_prompt, user_input, history, kwargs = request
+        return (
+            system_prompt,
+            user_input,
+            json.dumps(history, sort_keys=True),
+            json.dumps(kwargs, sort_keys=True, default=str),
+        )
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ResponseCache:
+    """Exact-match LRU cache for LLM responses with a per-entry TTL.
+
+    Keys are digests of everything that determines a response (route, model
+    options, system prompt, history and user input), so a hit can skip the
+    provider call. The route is part of the key because routes sharing a prompt
+    can still validate (and so accept) different outputs.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(
+        system_prompt: str,
+        user_input: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        kwargs: Optional[Dict[str, Any]] = None,
+        route: str = "",
+    ) -> bytes:
+        raw = "|".join(
+            (
+                route,
+                json.dumps(kwargs or {}, sort_keys=True, default=str),
+                system_prompt,
+                json.dumps(history or []),
+                user_input,
+            )
+        )
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: bytes, value: str):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def discard(self, key: bytes):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
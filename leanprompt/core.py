@@ -1,15 +1,152 @@
 import os
+import asyncio
+import json
+import re
+import importlib
 import yaml
-import hashlib
-from typing import Optional, Type, Callable, Dict, Any, List
+import httpx
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional, Type, Callable, Dict, Any, List, Tuple, Deque
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
 from pydantic import BaseModel, ValidationError
-from .providers.deepseek import DeepSeekProvider
-from .providers.openai import OpenAIProvider
-from .providers.google import GoogleProvider
-from .providers.ollama import OllamaProvider
 from .providers.base import BaseProvider
 from .guard import Guard
+from .batching import DynBatcher
+from .cache import ResponseCache
+from . import _json
+
+try:
+    # libyaml-backed loader is much faster than the pure-Python one
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# "---" line, YAML frontmatter, closing "---" line, then the prompt body
+_FRONTMATTER_RE = re.compile(
+    r"\A---[ \t]*\r?\n(.*?)^---[ \t]*\r?$\n?(.*)\Z", re.DOTALL | re.MULTILINE
+)
+
+# Provider name -> how to build it. Only the chosen provider module is imported.
+#   api_key / base_url: True = required, None = not passed, str = default value
+_PROVIDERS: Dict[str, Dict[str, Any]] = {
+    "deepseek": {
+        "module": "deepseek",
+        "class": "DeepSeekProvider",
+        "label": "DeepSeek",
+        "api_key": True,
+        "base_url": None,
+    },
+    "openai": {
+        "module": "openai",
+        "class": "OpenAIProvider",
+        "label": "OpenAI",
+        "api_key": True,
+        "base_url": None,
+    },
+    "google": {
+        "module": "google",
+        "class": "GoogleProvider",
+        "label": "Google",
+        "api_key": True,
+        "base_url": None,
+    },
+    # api_key not required for Ollama
+    "ollama": {
+        "module": "ollama",
+        "class": "OllamaProvider",
+        "label": "Ollama",
+        "api_key": None,
+        "base_url": "http://localhost:11434",
+    },
+    # vLLM is OpenAI-compatible
+    "vllm": {
+        "module": "openai",
+        "class": "OpenAIProvider",
+        "label": "vLLM",
+        "api_key": "vllm",
+        "base_url": True,
+    },
+    # llama-cpp-python server is OpenAI-compatible
+    "llama-cpp": {
+        "module": "openai",
+        "class": "OpenAIProvider",
+        "label": "llama-cpp-python",
+        "api_key": "llama-cpp",
+        "base_url": True,
+    },
+}
+
+
+def _create_provider(
+    provider: str,
+    api_key: Optional[str],
+    base_url: Optional[str],
+    provider_kwargs: Dict[str, Any],
+) -> BaseProvider:
+    spec = _PROVIDERS.get(provider)
+    if spec is None:
+        raise ValueError(f"Unsupported provider: {provider}")
+
+    kwargs = dict(provider_kwargs)
+    for name, value in (("api_key", api_key), ("base_url", base_url)):
+        rule = spec[name]
+        if rule is True:
+            if not value:
+                raise ValueError(f"{name} is required for {spec['label']} provider.")
+            kwargs[name] = value
+        elif isinstance(rule, str):
+            kwargs[name] = value or rule
+
+    module = importlib.import_module(f".providers.{spec['module']}", __package__)
+    return getattr(module, spec["class"])(**kwargs)
+
+
+async def _send_json(websocket: WebSocket, payload: Dict[str, Any]):
+    # Same wire format as WebSocket.send_json (a text frame) via the faster encoder
+    await websocket.send_text(_json.dumps(payload).decode("utf-8"))
+
+
+async def _read_json_body(request: Request) -> Dict[str, Any]:
+    # Validate Content-Type (parameters such as charset are allowed)
+    content_type = request.headers.get("content-type", "")
+    if not content_type.lower().startswith("application/json"):
+        raise HTTPException(
+            status_code=400, detail="Content-Type must be application/json"
+        )
+
+    # Parse Body
+    try:
+        body = _json.loads(await request.body())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    return body
+
+
+def _json_response(data: Any) -> Response:
+    # Serialize directly instead of FastAPI's jsonable_encoder walk + json.dumps
+    if isinstance(data, BaseModel):
+        if hasattr(data, "model_dump_json"):
+            body = data.model_dump_json(by_alias=True)
+        else:
+            body = data.json(by_alias=True)
+    else:
+        try:
+            body = _json.dumps(data)
+        except TypeError:
+            # Types the fast encoder rejects (e.g. ints wider than 64 bits):
+            # fall back to exactly what FastAPI's JSONResponse would send
+            body = json.dumps(
+                jsonable_encoder(data),
+                ensure_ascii=False,
+                allow_nan=False,
+                separators=(",", ":"),
+            ).encode("utf-8")
+    return Response(content=body, media_type="application/json")
 
 
 class LeanPrompt:
@@ -22,6 +159,15 @@ class LeanPrompt:
         base_url: Optional[str] = None,  # For Ollama or Custom URLs
         on_validation_error: str = "ignore",  # ignore, retry, raise
         max_retries: int = 3,  # 0 = infinite
+        max_history_turns: int = 20,  # WebSocket turns kept per path, 0 = infinite
+        http_client: Optional[httpx.AsyncClient] = None,  # Shared connection pool
+        batching: bool = False,  # Coalesce concurrent HTTP route calls
+        batch_max_size: int = 8,
+        batch_max_delay: float = 0.05,  # Seconds to wait for a batch to fill
+        response_cache_size: int = 10_000,  # 0 = disabled
+        response_cache_ttl: float = 3600.0,  # Seconds
+        batch_max_messages: int = 100,  # Per POST {path}/batch request
+        batch_concurrency: int = 8,  # Messages of one batch request in flight
         **provider_kwargs,
     ):
         self.app = app
@@ -29,59 +175,109 @@ class LeanPrompt:
         self.provider_name = provider
         self.on_validation_error = on_validation_error
         self.max_retries = max_retries
+        self.max_history_turns = max_history_turns
+        self.batch_max_messages = batch_max_messages
+        self.batch_concurrency = batch_concurrency
+
+        # The provider keeps one long-lived HTTP client per event loop, so
+        # connections (TCP + TLS) are pooled across requests instead of
+        # re-established per call. An injected client is used as-is.
+        provider_kwargs["http_client"] = http_client
 
         # Initialize provider
-        if provider == "deepseek":
-            if not api_key:
-                raise ValueError("api_key is required for DeepSeek provider.")
-            self.provider = DeepSeekProvider(api_key=api_key, **provider_kwargs)
-        elif provider == "openai":
-            if not api_key:
-                raise ValueError("api_key is required for OpenAI provider.")
-            self.provider = OpenAIProvider(api_key=api_key, **provider_kwargs)
-        elif provider == "google":
-            if not api_key:
-                raise ValueError("api_key is required for Google provider.")
-            self.provider = GoogleProvider(api_key=api_key, **provider_kwargs)
-        elif provider == "ollama":
-            # api_key not required for Ollama
-            ollama_url = base_url or "http://localhost:11434"
-            self.provider = OllamaProvider(base_url=ollama_url, **provider_kwargs)
-        elif provider == "vllm":
-            if not base_url:
-                raise ValueError("base_url is required for vLLM provider.")
-            # vLLM is OpenAI-compatible
-            self.provider = OpenAIProvider(
-                api_key=api_key or "vllm", base_url=base_url, **provider_kwargs
-            )
-        elif provider == "llama-cpp":
-            if not base_url:
-                raise ValueError("base_url is required for llama-cpp-python provider.")
-            # llama-cpp-python server is OpenAI-compatible
-            self.provider = OpenAIProvider(
-                api_key=api_key or "llama-cpp", base_url=base_url, **provider_kwargs
+        self.provider = _create_provider(provider, api_key, base_url, provider_kwargs)
+
+        self._batcher: Optional[DynBatcher] = None
+        if batching:
+            self._batcher = DynBatcher(
+                self.provider,
+                max_batch_size=batch_max_size,
+                max_delay=batch_max_delay,
             )
-        else:
-            raise ValueError(f"Unsupported provider: {provider}")
+
+        # Exact-match cache of successful responses for HTTP routes
+        self._resp_cache = ResponseCache(
+            maxsize=response_cache_size, ttl=response_cache_ttl
+        )
+
+        # Close the pooled client when the app shuts down
+        self._install_shutdown()
 
         self.routes_info = {}  # Store path -> prompt_file mapping
+        # WebSocket dispatch: every accepted spelling of a path -> prompt_file
+        self._ws_dispatch: Dict[str, str] = {}
+        # prompt_path -> (mtime, frontmatter, body, generate kwargs);
+        # invalidated when the file changes
+        self._prompt_cache: Dict[
+            str, Tuple[float, Dict[str, Any], str, Dict[str, Any]]
+        ] = {}
         self._setup_websocket()
 
+    def _install_shutdown(self):
+        # Wrap the app's lifespan (default or a custom `lifespan=`) rather than
+        # using on_shutdown, which custom lifespans never run
+        inner = self.app.router.lifespan_context
+
+        @asynccontextmanager
+        async def lifespan(app):
+            try:
+                async with inner(app) as state:
+                    yield state
+            finally:
+                await self.aclose()
+
+        self.app.router.lifespan_context = lifespan
+
+    async def aclose(self):
+        """Stops the batcher and closes the provider's own HTTP client."""
+        if self._batcher is not None:
+            await self._batcher.aclose()
+        await self.provider.aclose()
+
     def _load_prompt(self, prompt_file: str):
+        _, frontmatter, body, _ = self._prompt_entry(prompt_file)
+        return frontmatter, body
+
+    def _load_route_prompt(self, prompt_file: str):
+        """Returns (system_prompt, generate kwargs) prebuilt from the frontmatter."""
+        _, _, body, kwargs = self._prompt_entry(prompt_file)
+        return body, kwargs
+
+    def _prompt_entry(self, prompt_file: str):
         prompt_path = os.path.join(self.prompt_dir, prompt_file)
-        if not os.path.exists(prompt_path):
+        try:
+            mtime = os.stat(prompt_path).st_mtime
+        except OSError:
+            self._prompt_cache.pop(prompt_path, None)
             raise FileNotFoundError(f"Prompt file not found: {prompt_path}")
 
+        # Serve from cache unless the file was modified since it was parsed
+        cached = self._prompt_cache.get(prompt_path)
+        if cached is not None and cached[0] == mtime:
+            return cached
+
+        frontmatter, body = self._parse_prompt(prompt_path)
+
+        # Provider kwargs derived from config
+        kwargs = {}
+        if frontmatter.get("model"):
+            kwargs["model"] = frontmatter["model"]
+
+        entry = (mtime, frontmatter, body, kwargs)
+        self._prompt_cache[prompt_path] = entry
+        return entry
+
+    @staticmethod
+    def _parse_prompt(prompt_path: str):
         with open(prompt_path, "r", encoding="utf-8") as f:
             content = f.read()
 
-        # Simple frontmatter parsing
-        if content.startswith("---"):
-            parts = content.split("---", 2)
-            if len(parts) >= 3:
-                frontmatter = yaml.safe_load(parts[1])
-                body = parts[2].strip()
-                return frontmatter, body
+        # Simple frontmatter parsing, in a single scan
+        match = _FRONTMATTER_RE.match(content)
+        if match:
+            frontmatter = yaml.load(match.group(1), Loader=_YamlLoader) or {}
+            body = match.group(2).strip()
+            return frontmatter, body
         return {}, content.strip()
 
     def _setup_websocket(self):
@@ -89,103 +285,99 @@ class LeanPrompt:
         @self.app.websocket("/ws/{client_id}")
         async def websocket_endpoint(websocket: WebSocket, client_id: str):
             await websocket.accept()
-            # History keyed by path: { "/path1": [...], "/path2": [...] }
-            path_history: Dict[str, List[Dict[str, str]]] = {}
+            # History keyed by path: { "/path1": deque([...]), "/path2": ... }
+            # Bounded to the most recent turns so long sessions stay cheap
+            path_history: Dict[str, Deque[Dict[str, str]]] = {}
+            history_maxlen = self.max_history_turns * 2 or None
 
             try:
                 while True:
                     # Expect JSON input: {"path": "/foo", "message": "hello"}
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect(message.get("code", 1000))
                     try:
-                        data = await websocket.receive_json()
+                        data = _json.loads(message.get("text") or message["bytes"])
                         path = data.get("path")
                         user_input = data.get("message")
 
                         if not path or not user_input:
-                            await websocket.send_json(
+                            await _send_json(
+                                websocket,
                                 {
                                     "error": "Fields 'path' and 'message' are required",
                                     "path": path,
-                                }
+                                },
                             )
                             continue
                     except Exception:
-                        await websocket.send_json(
-                            {"error": "Invalid JSON format", "path": None}
+                        await _send_json(
+                            websocket, {"error": "Invalid JSON format", "path": None}
                         )
                         continue
 
-                    # Lookup prompt file from routes_info
-                    prompt_file = self.routes_info.get(path)
+                    # Lookup prompt file (single dict hit for any path variant)
+                    prompt_file = self._ws_dispatch.get(path)
                     if not prompt_file:
-                        await websocket.send_json(
-                            {"error": f"No route found for path: {path}", "path": path}
+                        await _send_json(
+                            websocket,
+                            {"error": f"No route found for path: {path}", "path": path},
                         )
                         continue
 
                     # Load prompt
                     try:
-                        config, system_prompt = self._load_prompt(prompt_file)
+                        system_prompt, kwargs = self._load_route_prompt(prompt_file)
                     except FileNotFoundError:
-                        await websocket.send_json(
+                        await _send_json(
+                            websocket,
                             {
                                 "error": f"Prompt file not found: {prompt_file}",
                                 "path": path,
-                            }
+                            },
                         )
                         continue
 
                     # Initialize history for this path if needed
                     if path not in path_history:
-                        path_history[path] = []
+                        path_history[path] = deque(maxlen=history_maxlen)
 
                     history = path_history[path]
 
-                    # Prepare kwargs from config
-                    kwargs = {}
-                    if config.get("model"):
-                        kwargs["model"] = config["model"]
-
                     # Generate Response
-                    response_buffer = ""
-                    # Streaming generation
-                    # Since we need to wrap the output in JSON {"response": ...}, streaming strictly chunk-by-chunk
-                    # as raw text is tricky if we want to maintain the protocol.
-                    # However, typical WS streaming sends partial updates.
-                    # The user requested: output: { "response": "..." }
-                    # To stream this, we can send multiple JSON frames like { "response": "chunk" }
-                    # OR accumulate and send one JSON at the end.
-                    # Given "Context Caching" implies interactivity, streaming is preferred.
-                    # Let's assume we stream partial chunks wrapped in JSON for now, or just raw text?
-                    # The prompt says: output: { "response": "..." }. This usually implies the final response.
-                    # But core features emphasize streaming. Let's support both or assume streaming chunks
-                    # with a flag, but for compatibility with the request format let's send ONE final JSON
-                    # if we want to strictly follow { "response": "..." } as a single message unit.
-                    # BUT, usually WS is for streaming. Let's assume we send ONE final message for now
-                    # to strictly match the requested format, OR send partials.
-                    # Let's send partials as { "response": "chunk", "stream": true } or similar?
-                    # The requirement "output: { "response": "..." }" likely means the payload structure.
-                    # If we stream, we might send many of these.
-
-                    # For now, let's accumulate and send ONE response to strictly match the requested JSON format example.
-                    # If streaming is absolutely required, we can change this.
-
-                    full_response = ""
+                    # Stream each chunk as a partial frame as soon as it arrives,
+                    # then send the complete response as the final frame:
+                    #   {"response": "chunk", "path": ..., "partial": true} ...
+                    #   {"response": "full text", "path": ..., "partial": false}
+                    # The frame tail is identical for every chunk of this turn
+                    partial_tail = b',"path":' + _json.dumps(path) + b',"partial":true}'
+                    chunks: List[str] = []
                     async for chunk in self.provider.generate_stream(
                         system_prompt=system_prompt,
                         user_input=user_input,
                         history=history,
                         **kwargs,
                     ):
-                        full_response += chunk
-                        # If we want real-time streaming:
-                        # await websocket.send_json({"response": chunk, "partial": True})
+                        chunks.append(chunk)
+                        await websocket.send_text(
+                            (
+                                b'{"response":' + _json.dumps(chunk) + partial_tail
+                            ).decode("utf-8")
+                        )
 
-                    # Send final complete response as requested
-                    await websocket.send_json({"response": full_response, "path": path})
+                    full_response = "".join(chunks)
+                    await _send_json(
+                        websocket,
+                        {"response": full_response, "path": path, "partial": False},
+                    )
 
                     # Update History (Context Caching)
-                    history.append({"role": "user", "content": user_input})
-                    history.append({"role": "assistant", "content": full_response})
+                    history.extend(
+                        (
+                            {"role": "user", "content": user_input},
+                            {"role": "assistant", "content": full_response},
+                        )
+                    )
 
             except WebSocketDisconnect:
                 print(f"Client #{client_id} disconnected")
@@ -194,7 +386,11 @@ class LeanPrompt:
         self,
         path: str,
         prompt_file: Optional[str] = None,
+        cache: bool = True,  # Disable for stochastic endpoints
+        batch: bool = False,  # Also register POST {path}/batch
     ):
+        use_cache = cache and self._resp_cache.maxsize > 0
+
         def decorator(func: Callable):
             # Resolve prompt file path logic
             resolved_prompt_file = prompt_file
@@ -208,57 +404,68 @@ class LeanPrompt:
 
             # Store routing info for WebSocket
             self.routes_info[path] = resolved_prompt_file
+            # Also accept the path without its leading slash ("calc/add")
+            self._ws_dispatch.setdefault(path.lstrip("/"), resolved_prompt_file)
+            self._ws_dispatch[path] = resolved_prompt_file
 
-            # Helper to load prompt (capture variable)
-            def load_current_prompt():
-                return self._load_prompt(resolved_prompt_file)
+            # Resolve validation once; the route's behaviour is fixed from here on
+            output_model = getattr(func, "_output_model", None)
+            custom_validator = getattr(func, "_custom_validator", None)
 
-            @self.app.post(path)
-            async def wrapper(request: Request):
-                # Validate Content-Type
-                if request.headers.get("content-type") != "application/json":
-                    raise HTTPException(
-                        status_code=400, detail="Content-Type must be application/json"
-                    )
-
-                # Parse Body
-                try:
-                    body = await request.json()
-                except Exception:
-                    raise HTTPException(status_code=400, detail="Invalid JSON body")
-
-                user_input = body.get("message")
-                if not user_input:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="Field 'message' is required in JSON body",
-                    )
+            # Parse the prompt up front so the first request is served from cache.
+            # A missing file is still reported per request, as before.
+            try:
+                self._load_prompt(resolved_prompt_file)
+            except FileNotFoundError:
+                pass
 
-                # 1. Load Prompt
-                config, system_prompt = load_current_prompt()
+            async def run(user_input: str):
+                """Generates and validates the response for a single message."""
+                # 1. Load Prompt (cached; reparsed only when the file changes)
+                system_prompt, kwargs = self._load_route_prompt(resolved_prompt_file)
 
                 # 2. Setup Loop
                 retries = 0
                 history: List[Dict[str, str]] = []
 
-                # Check model config
-                kwargs = {}
-                if config.get("model"):
-                    kwargs["model"] = config["model"]
+                # Identical requests are answered from the response cache
+                cache_key = None
+                cached_text = None
+                if use_cache:
+                    cache_key = ResponseCache.make_key(
+                        system_prompt, user_input, history, kwargs, route=path
+                    )
+                    cached_text = self._resp_cache.get(cache_key)
+
+                # Loop invariants, read once per request rather than per attempt
+                # (output_model/custom_validator are already fixed per route)
+                provider = self.provider
+                batcher = self._batcher
+                on_validation_error = self.on_validation_error
+                max_retries = self.max_retries
 
                 while True:
                     # 3. Get LLM Response
-                    response_text = await self.provider.generate(
-                        system_prompt=system_prompt,
-                        user_input=user_input if not history else "",
-                        history=history,
-                        **kwargs,
-                    )
+                    from_cache = cached_text is not None
+                    if from_cache:
+                        response_text, cached_text = cached_text, None
+                    elif batcher is not None:
+                        response_text = await batcher.submit(
+                            system_prompt,
+                            user_input,
+                            history,
+                            kwargs,
+                            dedupe=cache,
+                        )
+                    else:
+                        response_text = await provider.generate(
+                            system_prompt=system_prompt,
+                            user_input=user_input,
+                            history=history,
+                            **kwargs,
+                        )
 
                     # 4. Validation (Guard)
-                    output_model = getattr(func, "_output_model", None)
-                    custom_validator = getattr(func, "_custom_validator", None)
-
                     validated_data = None
                     validation_error = None
 
@@ -271,37 +478,47 @@ class LeanPrompt:
                             validated_data = custom_validator(response_text)
                         else:
                             # No validation needed
+                            if cache_key is not None and not from_cache:
+                                self._resp_cache.set(cache_key, response_text)
                             return response_text
                     except (ValueError, ValidationError) as e:
                         validation_error = e
 
                     if not validation_error:
+                        # Only successfully validated responses are cached;
+                        # hits are not re-stored, so the TTL counts from the
+                        # provider call rather than the last hit
+                        if cache_key is not None and not from_cache:
+                            self._resp_cache.set(cache_key, response_text)
                         return validated_data
 
+                    if from_cache:
+                        # Stale entry (e.g. the validator changed): drop it and
+                        # ask the LLM instead of treating it as a failed attempt
+                        self._resp_cache.discard(cache_key)
+                        continue
+
                     # Handle Failure
-                    if self.on_validation_error == "ignore":
+                    if on_validation_error == "ignore":
                         return ""
 
-                    if self.on_validation_error == "raise":
+                    if on_validation_error == "raise":
                         raise HTTPException(
                             status_code=500,
                             detail=f"LLM Output Validation Failed: {str(validation_error)}",
                         )
 
-                    if self.on_validation_error == "retry":
-                        if self.max_retries > 0 and retries >= self.max_retries:
+                    if on_validation_error == "retry":
+                        if max_retries > 0 and retries >= max_retries:
                             return ""
 
-                        if retries == 0:
-                            history.append({"role": "user", "content": user_input})
-                            history.append(
-                                {"role": "assistant", "content": response_text}
-                            )
-                        else:
-                            history.append({"role": "user", "content": user_input})
-                            history.append(
-                                {"role": "assistant", "content": response_text}
+                        # Keep the failed exchange so the LLM can see what to fix
+                        history.extend(
+                            (
+                                {"role": "user", "content": user_input},
+                                {"role": "assistant", "content": response_text},
                             )
+                        )
 
                         user_input = f"Validation Error: {str(validation_error)}. Please correct your response to match the required schema."
                         retries += 1
@@ -309,6 +526,50 @@ class LeanPrompt:
 
                 return response_text
 
+            @self.app.post(path)
+            async def wrapper(request: Request):
+                body = await _read_json_body(request)
+                user_input = body.get("message")
+                if not user_input:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Field 'message' is required in JSON body",
+                    )
+                return _json_response(await run(user_input))
+
+            if batch:
+
+                @self.app.post(path.rstrip("/") + "/batch")
+                async def batch_wrapper(request: Request):
+                    body = await _read_json_body(request)
+                    messages = body.get("messages")
+                    if (
+                        not isinstance(messages, list)
+                        or not messages
+                        or not all(isinstance(m, str) and m for m in messages)
+                    ):
+                        raise HTTPException(
+                            status_code=400,
+                            detail="Field 'messages' must be a non-empty list of strings",
+                        )
+                    if len(messages) > self.batch_max_messages:
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"At most {self.batch_max_messages} messages per batch",
+                        )
+
+                    # Messages are independent: generate them concurrently over
+                    # the shared connection pool (bounded per request), results
+                    # in request order
+                    semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+                    async def run_bounded(message: str):
+                        async with semaphore:
+                            return await run(message)
+
+                    results = await asyncio.gather(*(run_bounded(m) for m in messages))
+                    return _json_response(list(results))
+
             return wrapper
 
         return decorator
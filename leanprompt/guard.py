@@ -1,9 +1,11 @@
-import functools
-from typing import Type, Any, Callable
+from typing import Type, Any, Callable, Dict
 from pydantic import BaseModel, ValidationError
 
 
 class Guard:
+    # Model class -> bound JSON validator (Pydantic v2 or v1 API), resolved once
+    _validators: Dict[type, Callable[[str], BaseModel]] = {}
+
     @staticmethod
     def pydantic(model: Type[BaseModel]):
         """Returns a validator function that parses JSON into a Pydantic model."""
@@ -16,6 +18,8 @@ class Guard:
     @staticmethod
     def json():
         """Returns a validator function that ensures the output is valid JSON."""
+        # Stdlib on purpose: exact big ints and NaN/Infinity, with or without
+        # the optional orjson extra
         import json
 
         def validator(content: str) -> Any:
@@ -28,41 +32,47 @@ class Guard:
 
     @staticmethod
     def validate(model: Type[BaseModel]):
-        def decorator(func: Callable):
-            @functools.wraps(func)
-            async def wrapper(*args, **kwargs):
-                func._output_model = model
-                return await func(*args, **kwargs)
+        """Tags the route function with the Pydantic model its output must match."""
 
-            wrapper._output_model = model
-            return wrapper
+        # Resolve the validator now rather than on the first response
+        Guard._json_validator(model)
+
+        def decorator(func: Callable):
+            # LeanPrompt.route reads the tag; the function itself is never awaited
+            func._output_model = model
+            return func
 
         return decorator
 
     @staticmethod
     def custom(validator_func: Callable[[str], Any]):
-        def decorator(func: Callable):
-            @functools.wraps(func)
-            async def wrapper(*args, **kwargs):
-                func._custom_validator = validator_func
-                return await func(*args, **kwargs)
+        """Tags the route function with a custom output validator."""
 
-            wrapper._custom_validator = validator_func
-            return wrapper
+        def decorator(func: Callable):
+            func._custom_validator = validator_func
+            return func
 
         return decorator
 
+    @staticmethod
+    def _json_validator(model: Type[BaseModel]) -> Callable[[str], BaseModel]:
+        validator = Guard._validators.get(model)
+        if validator is None:
+            # Try Pydantic v2 API first, fallback to v1
+            if hasattr(model, "model_validate_json"):
+                validator = model.model_validate_json
+            else:
+                validator = model.parse_raw
+            Guard._validators[model] = validator
+        return validator
+
     @staticmethod
     def parse_and_validate(content: str, model: Type[BaseModel]) -> BaseModel:
         # Simply delegate to Pydantic's built-in parsing.
         # This assumes the content is a valid JSON string matching the model.
         # We do NOT attempt to strip markdown or parse YAML here.
         try:
-            # Try Pydantic v2 API first, fallback to v1
-            if hasattr(model, "model_validate_json"):
-                return model.model_validate_json(content)
-            else:
-                return model.parse_raw(content)
+            return Guard._json_validator(model)(content)
         except (ValidationError, ValueError) as e:
             raise ValueError(
                 f"Failed to validate LLM output against {model.__name__}: {str(e)}"
@@ -0,0 +1,72 @@
+"""Line-oriented stream parsing: SSE for the OpenAI-compatible providers, and
+the bulk line splitter they share with the NDJSON (Ollama) provider."""
+
+from typing import AsyncGenerator, List, Tuple
+
+import httpx
+
+from .. import _json
+
+
+def parse_lines(lines: List[bytes]) -> Tuple[str, bool]:
+    """Returns (joined delta text, whether [DONE] was seen) for SSE lines."""
+    pending = []
+    for line in lines:
+        if not line.startswith(b"data:"):
+            continue
+        data_str = line[5:].strip()
+        if data_str == b"[DONE]":
+            return "".join(pending), True
+        try:
+            data = _json.loads(data_str)
+            # Role-only and final deltas have no content key; skipped below
+            chunk = data["choices"][0]["delta"]["content"]
+        except (_json.JSONDecodeError, KeyError, IndexError, TypeError):
+            continue
+        if chunk:
+            pending.append(chunk)
+    return "".join(pending), False
+
+
+async def iter_line_batches(
+    response: httpx.Response,
+) -> AsyncGenerator[List[bytes], None]:
+    """Yields the complete lines of each network read together as one list.
+
+    Each read is split in one `bytes.split` call (a C loop) rather than line by
+    line, and a read that ends on a line boundary is split without being copied
+    into a buffer. Only a partial trailing line is carried over to the next read.
+    """
+    carry: List[bytes] = []
+    async for data in response.aiter_bytes():
+        lines = data.split(b"\n")
+        if len(lines) == 1:
+            carry.append(data)
+            continue
+        if carry:
+            carry.append(lines[0])
+            lines[0] = b"".join(carry)
+            carry = []
+        tail = lines.pop()
+        if tail:
+            carry.append(tail)
+        yield lines
+
+    # Trailing line without a final newline
+    if carry:
+        yield [b"".join(carry)]
+
+
+async def iter_delta_text(response: httpx.Response) -> AsyncGenerator[str, None]:
+    """Yields chat completion deltas from a streaming response.
+
+    Lines are handled as bytes (no per-line UTF-8 decode), and the deltas of
+    every line that arrived in one network read are yielded together, instead
+    of one yield per token.
+    """
+    async for lines in iter_line_batches(response):
+        text, done = parse_lines(lines)
+        if text:
+            yield text
+        if done:
+            return
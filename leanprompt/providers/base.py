@@ -1,24 +1,143 @@
+import asyncio
+import httpx
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator, List, Dict, Any, Optional
+from typing import AsyncGenerator, AsyncIterator, List, Sequence, Dict, Any, Optional
+from .. import _json
+
+try:
+    import h2  # noqa: F401  (installed by `httpx[http2]`)
+except ImportError:
+    _HTTP2 = False
+else:
+    _HTTP2 = True
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Long-lived pooled client shared by every call of a provider.
+
+    HTTP/2 is enabled when `h2` is installed, so concurrent requests to the same
+    provider are multiplexed over one connection instead of opening more.
+    """
+    return httpx.AsyncClient(
+        http2=_HTTP2,
+        limits=httpx.Limits(
+            max_connections=200,
+            max_keepalive_connections=100,
+            keepalive_expiry=30.0,
+        ),
+        timeout=httpx.Timeout(60.0, connect=10.0),
+    )
 
 
 class BaseProvider(ABC):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        # Shared, long-lived client (connection pool) injected by the caller.
+        # When absent, the provider creates and owns one per event loop.
+        self._http = http_client
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._owns_http = False
+        # system_prompt -> encoded {"role": "system", ...} message
+        self._system_messages: Dict[str, bytes] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Returns the injected client, or the provider's own client for this loop.
+
+        An owned client is per event loop: its pooled connections are bound to
+        the loop that opened them, so it is replaced when called from another
+        loop (e.g. TestClient runs each request outside `with` in a new loop).
+        The superseded client is abandoned, not closed: closing needs its
+        original loop, which is normally finished by then, so its sockets are
+        released by garbage collection. `aclose()` closes only the current one.
+        Long-lived apps run on one loop and never hit this; inject a client to
+        control the lifecycle explicitly.
+        """
+        if self._http is None or self._owns_http:
+            loop = asyncio.get_running_loop()
+            if self._http is None or self._http_loop is not loop:
+                self._http = create_http_client()
+                self._http_loop = loop
+                self._owns_http = True
+        return self._http
+
+    async def aclose(self):
+        # Injected clients belong to the caller and are left open
+        if self._owns_http and self._http is not None:
+            # A client from another (finished) loop cannot be closed from here
+            if self._http_loop is asyncio.get_running_loop():
+                await self._http.aclose()
+            self._http = None
+            self._http_loop = None
+            self._owns_http = False
+
+    def _system_message_bytes(self, system_prompt: str) -> bytes:
+        encoded = self._system_messages.get(system_prompt)
+        if encoded is None:
+            # Bounded: one entry per distinct prompt (file version)
+            if len(self._system_messages) >= 256:
+                self._system_messages.clear()
+            encoded = self._encode_system_message(system_prompt)
+            self._system_messages[system_prompt] = encoded
+        return encoded
+
+    def _encode_system_message(self, system_prompt: str) -> bytes:
+        # Chat-completions shape; providers with another format override this
+        return _json.dumps({"role": "system", "content": system_prompt})
+
+    def _encode_chat_body(
+        self,
+        fields: Dict[str, Any],
+        system_prompt: str,
+        history: Optional[Sequence[Dict[str, str]]],
+        user_input: str,
+    ) -> bytes:
+        """Encodes {**fields, "messages": [system, *history, user]} as JSON bytes.
+
+        The system message is serialized once per prompt and spliced in, so the
+        request prefix is byte-identical across calls (provider prompt caching).
+        """
+        head = _json.dumps(fields)[:-1] + b"," if fields else b"{"
+        parts = [head, b'"messages":[', self._system_message_bytes(system_prompt)]
+        if history:
+            # Encoded as-is (no copy into a combined list); deques become lists
+            if not isinstance(history, list):
+                history = list(history)
+            parts += (b",", _json.dumps(history)[1:-1])
+        parts += (
+            b",",
+            _json.dumps({"role": "user", "content": user_input}),
+            b"]}",
+        )
+        return b"".join(parts)
+
     @abstractmethod
     async def generate_stream(
         self,
         system_prompt: str,
         user_input: str,
-        history: Optional[List[Dict[str, str]]] = None,
+        history: Optional[Sequence[Dict[str, str]]] = None,
         **kwargs,
     ) -> AsyncGenerator[str, None]:
         yield
 
+    @staticmethod
+    async def collect(stream: AsyncIterator[str]) -> str:
+        """Joins the chunks of a `generate_stream` call into the full response.
+
+        Chunks are gathered in a list and joined once, keeping aggregation
+        linear instead of repeated `+=` concatenation.
+        """
+        parts: List[str] = []
+        append = parts.append
+        async for chunk in stream:
+            append(chunk)
+        return "".join(parts)
+
     @abstractmethod
     async def generate(
         self,
         system_prompt: str,
         user_input: str,
-        history: Optional[List[Dict[str, str]]] = None,
+        history: Optional[Sequence[Dict[str, str]]] = None,
         **kwargs,
     ) -> str:
         pass
@@ -1,7 +1,76 @@
+import re
 import httpx
-import json
-from typing import AsyncGenerator, List, Dict, Any, Optional
+from typing import AsyncGenerator, List, Sequence, Dict, Any, Optional, Tuple
 from .base import BaseProvider
+from .. import _json
+
+_HEADERS = {"Content-Type": "application/json"}
+# Compressed streams are inflated in blocks, which delays tokens
+_STREAM_HEADERS = {**_HEADERS, "Accept-Encoding": "identity"}
+
+# Characters that matter when looking for the end of a streamed JSON object
+_STRUCTURAL_RE = re.compile(rb'[{}"]')
+# Remainder of a JSON string after its opening quote, up to the closing quote
+_STRING_TAIL_RE = re.compile(rb'(?:[^"\\]|\\.)*"', re.DOTALL)
+
+
+def _scan_object(buffer: bytearray, pos: int, depth: int) -> Tuple[int, int]:
+    """Advances a brace count over `buffer` from `pos`, skipping string contents.
+
+    Works on raw UTF-8 bytes: multi-byte sequences never contain the ASCII
+    bytes being matched, so chunks split mid-character are handled as well.
+
+    Returns (pos, depth). A depth of 0 means the object closed just before
+    `pos`; otherwise `pos` is where to resume once more data has arrived (an
+    unterminated string is rescanned from its opening quote).
+    """
+    search = _STRUCTURAL_RE.search
+    match_string_tail = _STRING_TAIL_RE.match
+    while True:
+        m = search(buffer, pos)
+        if m is None:
+            return len(buffer), depth
+        char = m.group()
+        if char == b'"':
+            tail = match_string_tail(buffer, m.end())
+            if tail is None:
+                return m.start(), depth
+            pos = tail.end()
+        elif char == b"{":
+            depth += 1
+            pos = m.end()
+        else:
+            depth -= 1
+            pos = m.end()
+            if depth == 0:
+                return pos, 0
+
+
+def _build_contents(
+    history: Optional[Sequence[Dict[str, str]]], user_input: str
+) -> List[Dict[str, Any]]:
+    """Converts chat history plus the user input to Gemini `contents` in one pass."""
+    contents = [
+        {
+            "role": "user" if msg["role"] == "user" else "model",
+            "parts": [{"text": msg["content"]}],
+        }
+        for msg in history or ()
+    ]
+    contents.append({"role": "user", "parts": [{"text": user_input}]})
+    return contents
+
+
+def _candidate_text(obj: Any) -> str:
+    """Returns candidates[0].content.parts[0].text, or "" when absent.
+
+    Streamed objects without text (usage metadata, safety-only chunks) are
+    common, so this walks the path directly instead of building `.get` defaults.
+    """
+    try:
+        return obj["candidates"][0]["content"]["parts"][0]["text"]
+    except (KeyError, IndexError, TypeError):
+        return ""
 
 
 class GoogleProvider(BaseProvider):
@@ -9,136 +78,151 @@ class GoogleProvider(BaseProvider):
         self,
         api_key: str,
         base_url: str = "https://generativelanguage.googleapis.com/v1beta",
+        http_client: Optional[httpx.AsyncClient] = None,
     ):
+        super().__init__(http_client=http_client)
         if not api_key:
             raise ValueError("Google API key is required.")
         self.api_key = api_key
         self.base_url = base_url
+        # Endpoint URLs per model, built on first use instead of per request
+        self._stream_urls: Dict[str, str] = {}
+        self._urls: Dict[str, str] = {}
+
+    def _encode_system_message(self, system_prompt: str) -> bytes:
+        # System instruction support for newer models
+        return _json.dumps({"parts": [{"text": system_prompt}]})
+
+    def _encode_body(
+        self,
+        contents: List[Dict[str, Any]],
+        system_prompt: str,
+        options: Dict[str, Any],
+    ) -> bytes:
+        """Encodes {"contents": ..., **options, "system_instruction": ...} as JSON.
+
+        The system instruction is serialized once per prompt and spliced in.
+        """
+        fields = {"contents": contents}
+        if options:
+            fields.update(options)
+            if "system_instruction" in fields:
+                # Explicitly overridden by the caller; nothing to splice
+                return _json.dumps(fields)
+        return b"".join(
+            (
+                _json.dumps(fields)[:-1],
+                b',"system_instruction":',
+                self._system_message_bytes(system_prompt),
+                b"}",
+            )
+        )
 
     async def generate_stream(
         self,
         system_prompt: str,
         user_input: str,
-        history: Optional[List[Dict[str, str]]] = None,
+        history: Optional[Sequence[Dict[str, str]]] = None,
         **kwargs,
     ) -> AsyncGenerator[str, None]:
         # Google's API format is different (Gemini)
         # Assuming v1beta/models/gemini-pro:streamGenerateContent
 
-        contents = []
-        # Convert history
-        if history:
-            for msg in history:
-                role = "user" if msg["role"] == "user" else "model"
-                contents.append({"role": role, "parts": [{"text": msg["content"]}]})
+        # Convert history + current user input
+        contents = _build_contents(history, user_input)
 
         # System prompt is often passed as setup or first user message in Gemini context,
         # but for simplicity let's prepend it as user instruction or system instruction if supported.
         # Gemini 1.5 supports system_instruction.
 
-        # Current User Input
-        contents.append({"role": "user", "parts": [{"text": user_input}]})
+        model = kwargs.pop("model", "gemini-pro")
 
-        model = kwargs.get("model", "gemini-pro")
+        url = self._stream_urls.get(model)
+        if url is None:
+            url = f"{self.base_url}/models/{model}:streamGenerateContent?key={self.api_key}"
+            self._stream_urls[model] = url
 
-        url = f"{self.base_url}/models/{model}:streamGenerateContent?key={self.api_key}"
+        body = self._encode_body(contents, system_prompt, kwargs)
 
-        payload = {
-            "contents": contents,
-            # System instruction support for newer models
-            "system_instruction": {"parts": [{"text": system_prompt}]},
-            **{k: v for k, v in kwargs.items() if k != "model"},
-        }
+        client = self._get_client()
+        async with client.stream(
+            "POST", url, content=body, headers=_STREAM_HEADERS, timeout=60.0
+        ) as response:
+            if response.status_code != 200:
+                error_text = await response.aread()
+                raise RuntimeError(
+                    f"Google API error ({response.status_code}): {error_text.decode()}"
+                )
 
-        headers = {"Content-Type": "application/json"}
-
-        async with httpx.AsyncClient() as client:
-            async with client.stream(
-                "POST", url, json=payload, headers=headers, timeout=60.0
-            ) as response:
-                if response.status_code != 200:
-                    error_text = await response.aread()
-                    raise RuntimeError(
-                        f"Google API error ({response.status_code}): {error_text.decode()}"
-                    )
-
-                buffer = ""
-                decoder = json.JSONDecoder()
-
-                async for chunk in response.aiter_text():
-                    buffer += chunk
-
-                    while True:
-                        # Clean up buffer to find start of JSON object
-                        # The stream is typically a JSON array: [ {...}, {...} ]
-                        # We want to strip leading '[', ',', whitespace
-                        buffer = buffer.lstrip().lstrip("[").lstrip(",").lstrip()
-
-                        # If buffer is empty or just has closing bracket, wait for more
-                        if not buffer or buffer.startswith("]"):
-                            if buffer.startswith("]"):
-                                buffer = buffer[1:].lstrip()
+            # The stream is typically a JSON array: [ {...}, {...} ]
+            # `pos` marks the start of the current object and `scan` where the
+            # brace count resumes, so each chunk is scanned once and only
+            # complete objects are handed to the decoder. The stream is kept as
+            # bytes throughout instead of being decoded to text chunk by chunk.
+            buffer = bytearray()
+            pos = 0
+            scan = 0
+            depth = 0
+
+            async for chunk in response.aiter_bytes():
+                # Drop the consumed head in place before appending
+                if pos:
+                    del buffer[:pos]
+                    scan -= pos
+                    pos = 0
+                buffer.extend(chunk)
+
+                while True:
+                    if not depth:
+                        # Skip whitespace and '[', ',', ']' between objects
+                        start = buffer.find(b"{", pos)
+                        if start < 0:
+                            pos = len(buffer)
                             break
+                        pos = scan = start
 
-                        try:
-                            # Try to decode a single JSON object from the start of the buffer
-                            obj, idx = decoder.raw_decode(buffer)
-
-                            # Process the object
-                            # Structure: candidates[0].content.parts[0].text
-                            candidates = obj.get("candidates", [])
-                            if candidates:
-                                content = candidates[0].get("content", {})
-                                parts = content.get("parts", [])
-                                if parts:
-                                    text = parts[0].get("text", "")
-                                    if text:
-                                        yield text
-
-                            # Advance buffer past this object
-                            buffer = buffer[idx:]
-
-                        except json.JSONDecodeError:
-                            # Incomplete JSON object, wait for more data
-                            break
+                    scan, depth = _scan_object(buffer, scan, depth)
+                    if depth:
+                        # Incomplete JSON object, wait for more data
+                        break
+
+                    try:
+                        obj = _json.loads(buffer[pos:scan])
+                    except _json.JSONDecodeError:
+                        obj = None
+                    pos = scan
+
+                    # Structure: candidates[0].content.parts[0].text
+                    text = _candidate_text(obj)
+                    if text:
+                        yield text
 
     async def generate(
         self,
         system_prompt: str,
         user_input: str,
-        history: Optional[List[Dict[str, str]]] = None,
+        history: Optional[Sequence[Dict[str, str]]] = None,
         **kwargs,
     ) -> str:
-        contents = []
-        if history:
-            for msg in history:
-                role = "user" if msg["role"] == "user" else "model"
-                contents.append({"role": role, "parts": [{"text": msg["content"]}]})
+        contents = _build_contents(history, user_input)
 
-        contents.append({"role": "user", "parts": [{"text": user_input}]})
+        model = kwargs.pop("model", "gemini-pro")
+        url = self._urls.get(model)
+        if url is None:
+            url = f"{self.base_url}/models/{model}:generateContent?key={self.api_key}"
+            self._urls[model] = url
 
-        model = kwargs.get("model", "gemini-pro")
-        url = f"{self.base_url}/models/{model}:generateContent?key={self.api_key}"
+        body = self._encode_body(contents, system_prompt, kwargs)
 
-        payload = {
-            "contents": contents,
-            "system_instruction": {"parts": [{"text": system_prompt}]},
-            **{k: v for k, v in kwargs.items() if k != "model"},
-        }
-
-        headers = {"Content-Type": "application/json"}
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url, json=payload, headers=headers, timeout=60.0
+        client = self._get_client()
+        response = await client.post(url, content=body, headers=_HEADERS, timeout=60.0)
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"Google API error ({response.status_code}): {response.text}"
             )
-            if response.status_code != 200:
-                raise RuntimeError(
-                    f"Google API error ({response.status_code}): {response.text}"
-                )
 
-            data = response.json()
-            try:
-                return data["candidates"][0]["content"]["parts"][0]["text"]
-            except (KeyError, IndexError):
-                raise RuntimeError(f"Unexpected Google API response: {data}")
+        data = _json.loads(response.content)
+        try:
+            return data["candidates"][0]["content"]["parts"][0]["text"]
+        except (KeyError, IndexError):
+            raise RuntimeError(f"Unexpected Google API response: {data}")
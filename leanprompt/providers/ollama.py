@@ -1,91 +1,110 @@
 import httpx
-import json
-from typing import AsyncGenerator, List, Dict, Any, Optional
+from typing import AsyncGenerator, List, Sequence, Dict, Optional, Tuple
 from .base import BaseProvider
+from ._sse import iter_line_batches
+from .. import _json
+
+_HEADERS = {"Content-Type": "application/json"}
+# Compressed streams are inflated in blocks, which delays tokens
+_STREAM_HEADERS = {**_HEADERS, "Accept-Encoding": "identity"}
+
+
+def _parse_records(lines: List[bytes]) -> Tuple[str, bool]:
+    """Returns (joined message text, whether `done` was seen) for NDJSON lines."""
+    pending = []
+    for line in lines:
+        if not line:
+            continue
+        try:
+            data = _json.loads(line)
+            if data["done"]:
+                return "".join(pending), True
+
+            # Ollama chat response structure
+            chunk = data["message"]["content"]
+        except (_json.JSONDecodeError, KeyError, TypeError):
+            continue
+        if chunk:
+            pending.append(chunk)
+    return "".join(pending), False
 
 
 class OllamaProvider(BaseProvider):
-    def __init__(self, base_url: str = "http://localhost:11434"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
+        super().__init__(http_client=http_client)
         # Ollama typically doesn't require an API key for local access
         self.base_url = base_url.rstrip("/")
+        self._chat_url = f"{self.base_url}/api/chat"
 
     async def generate_stream(
         self,
         system_prompt: str,
         user_input: str,
-        history: Optional[List[Dict[str, str]]] = None,
+        history: Optional[Sequence[Dict[str, str]]] = None,
         **kwargs,
     ) -> AsyncGenerator[str, None]:
-        messages = [{"role": "system", "content": system_prompt}]
-        if history:
-            messages.extend(history)
-        messages.append({"role": "user", "content": user_input})
-
         # Ollama API: /api/chat
         payload = {
-            "model": kwargs.get("model", "qwen2.5-coder"),  # Default example model
-            "messages": messages,
+            "model": kwargs.pop("model", "qwen2.5-coder"),  # Default example model
             "stream": True,
-            **{k: v for k, v in kwargs.items() if k != "model"},
         }
+        if kwargs:
+            payload.update(kwargs)
+        body = self._encode_chat_body(payload, system_prompt, history, user_input)
 
-        async with httpx.AsyncClient() as client:
-            async with client.stream(
-                "POST",
-                f"{self.base_url}/api/chat",
-                json=payload,
-                timeout=120.0,
-            ) as response:
-                if response.status_code != 200:
-                    error_text = await response.aread()
-                    raise RuntimeError(
-                        f"Ollama API error ({response.status_code}): {error_text.decode()}"
-                    )
-
-                async for line in response.aiter_lines():
-                    if not line.strip():
-                        continue
-                    try:
-                        data = json.loads(line)
-                        if data.get("done"):
-                            break
+        client = self._get_client()
+        async with client.stream(
+            "POST",
+            self._chat_url,
+            content=body,
+            headers=_STREAM_HEADERS,
+            timeout=120.0,
+        ) as response:
+            if response.status_code != 200:
+                error_text = await response.aread()
+                raise RuntimeError(
+                    f"Ollama API error ({response.status_code}): {error_text.decode()}"
+                )
 
-                        # Ollama chat response structure
-                        chunk = data.get("message", {}).get("content", "")
-                        if chunk:
-                            yield chunk
-                    except json.JSONDecodeError:
-                        continue
+            # Records are split at the byte level once per network read
+            # instead of being decoded and buffered line by line
+            async for lines in iter_line_batches(response):
+                text, done = _parse_records(lines)
+                if text:
+                    yield text
+                if done:
+                    return
 
     async def generate(
         self,
         system_prompt: str,
         user_input: str,
-        history: Optional[List[Dict[str, str]]] = None,
+        history: Optional[Sequence[Dict[str, str]]] = None,
         **kwargs,
     ) -> str:
-        messages = [{"role": "system", "content": system_prompt}]
-        if history:
-            messages.extend(history)
-        messages.append({"role": "user", "content": user_input})
-
         payload = {
-            "model": kwargs.get("model", "qwen2.5-coder"),
-            "messages": messages,
+            "model": kwargs.pop("model", "qwen2.5-coder"),
             "stream": False,
-            **{k: v for k, v in kwargs.items() if k != "model"},
         }
+        if kwargs:
+            payload.update(kwargs)
+        body = self._encode_chat_body(payload, system_prompt, history, user_input)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/api/chat",
-                json=payload,
-                timeout=120.0,
+        client = self._get_client()
+        response = await client.post(
+            self._chat_url,
+            content=body,
+            headers=_HEADERS,
+            timeout=120.0,
+        )
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"Ollama API error ({response.status_code}): {response.text}"
             )
-            if response.status_code != 200:
-                raise RuntimeError(
-                    f"Ollama API error ({response.status_code}): {response.text}"
-                )
 
-            data = response.json()
-            return data.get("message", {}).get("content", "")
+        data = _json.loads(response.content)
+        return data["message"]["content"]
@@ -1,102 +1,89 @@
 import httpx
-import json
-from typing import AsyncGenerator, List, Dict, Any, Optional
+from typing import AsyncGenerator, Sequence, Dict, Optional
 from .base import BaseProvider
+from ._sse import iter_delta_text
+from .. import _json
 
 
 class OpenAIProvider(BaseProvider):
-    def __init__(self, api_key: str, base_url: str = "https://api.openai.com/v1"):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.openai.com/v1",
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
+        super().__init__(http_client=http_client)
         if not api_key:
             raise ValueError("OpenAI API key is required.")
         self.api_key = api_key
         self.base_url = base_url
+        # Static per provider instance; built once instead of per request
+        self._chat_url = f"{base_url}/chat/completions"
+        self._headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        }
+        # Compressed streams are inflated in blocks, which delays tokens
+        self._stream_headers = {**self._headers, "Accept-Encoding": "identity"}
 
     async def generate_stream(
         self,
         system_prompt: str,
         user_input: str,
-        history: Optional[List[Dict[str, str]]] = None,
+        history: Optional[Sequence[Dict[str, str]]] = None,
         **kwargs,
     ) -> AsyncGenerator[str, None]:
-        messages = [{"role": "system", "content": system_prompt}]
-        if history:
-            messages.extend(history)
-        messages.append({"role": "user", "content": user_input})
-
         payload = {
-            "model": kwargs.get("model", "gpt-3.5-turbo"),
-            "messages": messages,
+            "model": kwargs.pop("model", "gpt-3.5-turbo"),
             "stream": True,
-            **{k: v for k, v in kwargs.items() if k != "model"},
         }
+        if kwargs:
+            payload.update(kwargs)
+        body = self._encode_chat_body(payload, system_prompt, history, user_input)
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-
-        async with httpx.AsyncClient() as client:
-            async with client.stream(
-                "POST",
-                f"{self.base_url}/chat/completions",
-                json=payload,
-                headers=headers,
-                timeout=60.0,
-            ) as response:
-                if response.status_code != 200:
-                    error_text = await response.aread()
-                    raise RuntimeError(
-                        f"OpenAI API error ({response.status_code}): {error_text.decode()}"
-                    )
+        client = self._get_client()
+        async with client.stream(
+            "POST",
+            self._chat_url,
+            content=body,
+            headers=self._stream_headers,
+            timeout=60.0,
+        ) as response:
+            if response.status_code != 200:
+                error_text = await response.aread()
+                raise RuntimeError(
+                    f"OpenAI API error ({response.status_code}): {error_text.decode()}"
+                )
 
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        data_str = line[6:].strip()
-                        if data_str == "[DONE]":
-                            break
-                        try:
-                            data = json.loads(data_str)
-                            chunk = data["choices"][0]["delta"].get("content", "")
-                            if chunk:
-                                yield chunk
-                        except json.JSONDecodeError:
-                            continue
+            async for text in iter_delta_text(response):
+                yield text
 
     async def generate(
         self,
         system_prompt: str,
         user_input: str,
-        history: Optional[List[Dict[str, str]]] = None,
+        history: Optional[Sequence[Dict[str, str]]] = None,
         **kwargs,
     ) -> str:
-        messages = [{"role": "system", "content": system_prompt}]
-        if history:
-            messages.extend(history)
-        messages.append({"role": "user", "content": user_input})
-
         payload = {
-            "model": kwargs.get("model", "gpt-3.5-turbo"),
-            "messages": messages,
+            "model": kwargs.pop("model", "gpt-3.5-turbo"),
             "stream": False,
-            **{k: v for k, v in kwargs.items() if k != "model"},
-        }
-
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
         }
+        if kwargs:
+            payload.update(kwargs)
+        body = self._encode_chat_body(payload, system_prompt, history, user_input)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                json=payload,
-                headers=headers,
-                timeout=60.0,
+        client = self._get_client()
+        response = await client.post(
+            self._chat_url,
+            content=body,
+            headers=self._headers,
+            timeout=60.0,
+        )
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"OpenAI API error ({response.status_code}): {response.text}"
             )
-            if response.status_code != 200:
-                raise RuntimeError(
-                    f"OpenAI API error ({response.status_code}): {response.text}"
-                )
 
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
+        data = _json.loads(response.content)
+        return data["choices"][0]["message"]["content"]
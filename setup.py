@@ -29,5 +29,12 @@ setup(
         "Topic :: Scientific/Engineering :: Artificial Intelligence",
     ],
     install_requires=["fastapi", "uvicorn", "pydantic", "httpx", "pyyaml", "jinja2"],
+    extras_require={
+        "fast": [
+            "orjson",
+            "httpx[http2]",
+            'uvloop; platform_system != "Windows"',
+        ],
+    },
     python_requires=">=3.8",
 )
@@ -0,0 +1,480 @@
+import os
+import time
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from leanprompt import LeanPrompt, Guard
+from leanprompt.batching import DynBatcher
+from leanprompt.providers.base import BaseProvider
+
+# --- Helpers ---
+
+
+class FakeProvider(BaseProvider):
+    """Provider that replays canned responses and records every call."""
+
+    def __init__(self, responses=None):
+        super().__init__()
+        self.responses = list(responses or [])
+        self.calls = []
+
+    async def generate(self, system_prompt, user_input, history=None, **kwargs):
+        self.calls.append(
+            {
+                "system_prompt": system_prompt,
+                "user_input": user_input,
+                "history": list(history or []),
+                **kwargs,
+            }
+        )
+        await asyncio.sleep(0)
+        return self.responses.pop(0) if self.responses else user_input
+
+    async def generate_stream(self, system_prompt, user_input, history=None, **kwargs):
+        text = await self.generate(system_prompt, user_input, history, **kwargs)
+        for i in range(0, len(text), 2):
+            yield text[i : i + 2]
+
+
+def write_prompt(prompt_dir, name, body, model="test-model"):
+    path = os.path.join(prompt_dir, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"---\nmodel: {model}\n---\n{body}\n")
+    return path
+
+
+@pytest.fixture
+def prompt_dir(tmp_path):
+    return str(tmp_path)
+
+
+@pytest.fixture
+def lp(prompt_dir):
+    return LeanPrompt(
+        FastAPI(), provider="openai", prompt_dir=prompt_dir, api_key="dummy_key"
+    )
+
+
+class CalculationResult(BaseModel):
+    result: int
+
+
+def post(client, path, message):
+    return client.post(path, json={"message": message})
+
+
+def receive_final(websocket):
+    """Reads streamed partial frames until the final (complete) frame."""
+    chunks = []
+    while True:
+        frame = websocket.receive_json()
+        if not frame.get("partial"):
+            return frame, chunks
+        chunks.append(frame["response"])
+
+
+# --- Prompt Loading ---
+
+
+def test_load_prompt_is_cached_until_file_changes(lp, prompt_dir):
+    path = write_prompt(prompt_dir, "echo.md", "You echo.")
+
+    config, body = lp._load_prompt("echo.md")
+    assert config == {"model": "test-model"}
+    assert body == "You echo."
+
+    # Cache hit returns the very same parsed objects
+    assert lp._load_prompt("echo.md")[0] is config
+
+    write_prompt(prompt_dir, "echo.md", "You shout.", model="other-model")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    config, body = lp._load_prompt("echo.md")
+    assert config == {"model": "other-model"}
+    assert body == "You shout."
+
+
+def test_load_prompt_missing_file(lp):
+    with pytest.raises(FileNotFoundError):
+        lp._load_prompt("missing.md")
+
+
+# --- Guard ---
+
+
+def test_guard_json_validator():
+    validator = Guard.json()
+    assert validator('{"result": 3}') == {"result": 3}
+    with pytest.raises(ValueError):
+        validator("not json")
+    # Same result whether or not orjson is installed
+    assert validator("123456789012345678901234567890") == 123456789012345678901234567890
+    assert validator('{"x": NaN}')["x"] != validator('{"x": NaN}')["x"]
+
+
+def test_guard_parse_and_validate():
+    assert Guard.parse_and_validate('{"result": 3}', CalculationResult).result == 3
+    with pytest.raises(ValueError):
+        Guard.parse_and_validate('{"result": "three"}', CalculationResult)
+
+
+# --- Batching ---
+
+
+@pytest.mark.asyncio
+async def test_batcher_coalesces_identical_requests():
+    provider = FakeProvider()
+    batcher = DynBatcher(provider, max_batch_size=8, max_delay=0.01)
+
+    results = await asyncio.gather(
+        batcher.submit("sys", "same", [], {"model": "m"}),
+        batcher.submit("sys", "same", [], {"model": "m"}),
+        batcher.submit("sys", "other", [], {"model": "m"}),
+    )
+    await batcher.aclose()
+
+    assert results == ["same", "same", "other"]
+    assert sorted(c["user_input"] for c in provider.calls) == ["other", "same"]
+
+
+@pytest.mark.asyncio
+async def test_batcher_aclose_fails_pending_requests():
+    class HangingProvider(FakeProvider):
+        async def generate(self, *args, **kwargs):
+            await asyncio.Event().wait()
+
+    batcher = DynBatcher(HangingProvider(), max_batch_size=1, max_delay=0)
+    pending = [
+        asyncio.ensure_future(batcher.submit("sys", msg, [], {}))
+        for msg in ("a", "b", "c")
+    ]
+    await asyncio.sleep(0.01)  # let the first requests reach the provider
+
+    await batcher.aclose()
+
+    for future in pending:
+        with pytest.raises(RuntimeError, match="closed"):
+            await asyncio.wait_for(future, 1)
+
+
+def test_batched_route_without_cache_does_not_merge_requests(prompt_dir):
+    write_prompt(prompt_dir, "story.md", "You tell stories.")
+    lp = LeanPrompt(
+        FastAPI(),
+        provider="openai",
+        prompt_dir=prompt_dir,
+        api_key="dummy_key",
+        batching=True,
+    )
+    lp.provider = lp._batcher.provider = FakeProvider(["A", "B", "C"])
+
+    @lp.route("/story", prompt_file="story.md", cache=False, batch=True)
+    async def story(user_input: str):
+        pass
+
+    client = TestClient(lp.app)
+    response = client.post("/story/batch", json={"messages": ["go", "go", "go"]})
+    assert sorted(response.json()) == ["A", "B", "C"]
+    assert len(lp.provider.calls) == 3
+
+
+# --- Responses ---
+
+
+def test_route_serves_ints_wider_than_64_bits(lp, prompt_dir):
+    write_prompt(prompt_dir, "big.md", "You count.")
+    lp.provider = FakeProvider(["123456789012345678901234567890"])
+
+    @lp.route("/big", prompt_file="big.md")
+    @Guard.custom(lambda text: {"result": int(text)})
+    async def big(user_input: str):
+        pass
+
+    response = post(TestClient(lp.app), "/big", "count")
+    assert response.status_code == 200
+    assert response.content == b'{"result":123456789012345678901234567890}'
+
+
+# --- Response Cache ---
+
+
+def test_route_serves_identical_requests_from_cache(lp, prompt_dir):
+    write_prompt(prompt_dir, "add.md", "You add.")
+    lp.provider = FakeProvider(['{"result": 3}'])
+
+    @lp.route("/add", prompt_file="add.md")
+    @Guard.validate(CalculationResult)
+    async def add(user_input: str):
+        pass
+
+    client = TestClient(lp.app)
+    assert post(client, "/add", "1 + 2").json() == {"result": 3}
+    assert post(client, "/add", "1 + 2").json() == {"result": 3}
+    assert len(lp.provider.calls) == 1
+
+
+def test_route_cache_hits_do_not_extend_ttl(prompt_dir):
+    write_prompt(prompt_dir, "echo.md", "You echo.")
+    lp = LeanPrompt(
+        FastAPI(),
+        provider="openai",
+        prompt_dir=prompt_dir,
+        api_key="dummy_key",
+        response_cache_ttl=0.2,
+    )
+    lp.provider = FakeProvider(["first", "second"])
+
+    @lp.route("/echo", prompt_file="echo.md")
+    async def echo(user_input: str):
+        pass
+
+    client = TestClient(lp.app)
+    assert post(client, "/echo", "hi").json() == "first"
+    time.sleep(0.15)
+    assert post(client, "/echo", "hi").json() == "first"  # hit, TTL not reset
+    time.sleep(0.1)
+    assert post(client, "/echo", "hi").json() == "second"
+    assert len(lp.provider.calls) == 2
+
+
+def test_route_cache_is_scoped_per_route(lp, prompt_dir):
+    write_prompt(prompt_dir, "shared.md", "You answer.")
+    lp.provider = FakeProvider(["three", '{"result": 3}'])
+
+    @lp.route("/explain", prompt_file="shared.md")
+    async def explain(user_input: str):
+        pass
+
+    @lp.route("/calc", prompt_file="shared.md")
+    @Guard.validate(CalculationResult)
+    async def calc(user_input: str):
+        pass
+
+    client = TestClient(lp.app)
+    assert post(client, "/explain", "1 + 2").json() == "three"
+    assert post(client, "/calc", "1 + 2").json() == {"result": 3}
+    assert len(lp.provider.calls) == 2
+
+
+def test_route_cache_hit_failing_validation_is_refreshed(lp, prompt_dir):
+    write_prompt(prompt_dir, "add.md", "You add.")
+    lp.provider = FakeProvider(['{"result": 3}'])
+
+    @lp.route("/add", prompt_file="add.md")
+    @Guard.validate(CalculationResult)
+    async def add(user_input: str):
+        pass
+
+    system_prompt, kwargs = lp._load_route_prompt("add.md")
+    key = lp._resp_cache.make_key(system_prompt, "1 + 2", [], kwargs, route="/add")
+    lp._resp_cache.set(key, "three")
+
+    client = TestClient(lp.app)
+    assert post(client, "/add", "1 + 2").json() == {"result": 3}
+    assert len(lp.provider.calls) == 1
+    assert lp._resp_cache.get(key) == '{"result": 3}'
+
+
+def test_route_cache_opt_out(lp, prompt_dir):
+    write_prompt(prompt_dir, "echo.md", "You echo.")
+    lp.provider = FakeProvider()
+
+    @lp.route("/echo", prompt_file="echo.md", cache=False)
+    async def echo(user_input: str):
+        pass
+
+    client = TestClient(lp.app)
+    assert post(client, "/echo", "hi").json() == "hi"
+    assert post(client, "/echo", "hi").json() == "hi"
+    assert len(lp.provider.calls) == 2
+
+
+# --- Lifecycle ---
+
+
+def test_custom_lifespan_still_closes_provider_client(prompt_dir):
+    events = []
+
+    @asynccontextmanager
+    async def lifespan(app):
+        events.append("startup")
+        yield
+        events.append("shutdown")
+
+    lp = LeanPrompt(
+        FastAPI(lifespan=lifespan),
+        provider="openai",
+        prompt_dir=prompt_dir,
+        api_key="dummy_key",
+    )
+
+    async def get_client():
+        return lp.provider._get_client()
+
+    with TestClient(lp.app) as test_client:
+        # Created on the app's event loop, as a request would
+        client = test_client.portal.call(get_client)
+        assert not client.is_closed
+
+    assert events == ["startup", "shutdown"]
+    assert client.is_closed
+
+
+# --- WebSocket ---
+
+
+def test_websocket_history_is_bounded(prompt_dir):
+    write_prompt(prompt_dir, "chat.md", "You chat.")
+    lp = LeanPrompt(
+        FastAPI(),
+        provider="openai",
+        prompt_dir=prompt_dir,
+        api_key="dummy_key",
+        max_history_turns=1,
+    )
+    lp.provider = FakeProvider()
+
+    @lp.route("/chat", prompt_file="chat.md")
+    async def chat(user_input: str):
+        pass
+
+    client = TestClient(lp.app)
+    with client.websocket_connect("/ws/test_client") as websocket:
+        for message in ["one", "two", "three"]:
+            websocket.send_json({"path": "/chat", "message": message})
+            frame, chunks = receive_final(websocket)
+            assert frame["response"] == "".join(chunks) == message
+
+    # Only the latest turn is replayed to the provider
+    assert lp.provider.calls[-1]["history"] == [
+        {"role": "user", "content": "two"},
+        {"role": "assistant", "content": "two"},
+    ]
+
+
+def test_websocket_accepts_path_without_leading_slash(lp, prompt_dir):
+    write_prompt(prompt_dir, "echo.md", "You echo.")
+    lp.provider = FakeProvider()
+
+    @lp.route("/calc/echo", prompt_file="echo.md")
+    async def echo(user_input: str):
+        pass
+
+    client = TestClient(lp.app)
+    with client.websocket_connect("/ws/test_client") as websocket:
+        websocket.send_json({"path": "calc/echo", "message": "hi"})
+        frame, _ = receive_final(websocket)
+        assert frame == {"response": "hi", "path": "calc/echo", "partial": False}
+
+        websocket.send_json({"path": "/missing", "message": "hi"})
+        assert "No route found" in websocket.receive_json()["error"]
+
+
+# --- HTTP Routes ---
+
+
+def test_route_accepts_json_content_type_parameters(lp, prompt_dir):
+    write_prompt(prompt_dir, "echo.md", "You echo.")
+    lp.provider = FakeProvider()
+
+    @lp.route("/echo", prompt_file="echo.md")
+    async def echo(user_input: str):
+        pass
+
+    client = TestClient(lp.app)
+    response = client.post(
+        "/echo",
+        content=b'{"message": "hi"}',
+        headers={"Content-Type": "application/json; charset=utf-8"},
+    )
+    assert response.json() == "hi"
+
+    response = client.post(
+        "/echo", content=b"message=hi", headers={"Content-Type": "text/plain"}
+    )
+    assert response.status_code == 400
+
+
+def test_route_retry_sends_validation_error_to_llm(prompt_dir):
+    write_prompt(prompt_dir, "add.md", "You add.")
+    lp = LeanPrompt(
+        FastAPI(),
+        provider="openai",
+        prompt_dir=prompt_dir,
+        api_key="dummy_key",
+        on_validation_error="retry",
+    )
+    lp.provider = FakeProvider(["three", '{"result": 3}'])
+
+    @lp.route("/add", prompt_file="add.md")
+    @Guard.validate(CalculationResult)
+    async def add(user_input: str):
+        pass
+
+    client = TestClient(lp.app)
+    assert post(client, "/add", "1 + 2").json() == {"result": 3}
+
+    retry_call = lp.provider.calls[1]
+    assert retry_call["user_input"].startswith("Validation Error:")
+    assert retry_call["history"] == [
+        {"role": "user", "content": "1 + 2"},
+        {"role": "assistant", "content": "three"},
+    ]
+
+
+def test_route_batch_endpoint(lp, prompt_dir):
+    write_prompt(prompt_dir, "echo.md", "You echo.")
+    lp.provider = FakeProvider()
+
+    @lp.route("/echo", prompt_file="echo.md", batch=True)
+    async def echo(user_input: str):
+        pass
+
+    client = TestClient(lp.app)
+    response = client.post("/echo/batch", json={"messages": ["a", "b", "c"]})
+    assert response.json() == ["a", "b", "c"]
+    assert len(lp.provider.calls) == 3
+
+    response = client.post("/echo/batch", json={"messages": []})
+    assert response.status_code == 400
+
+
+def test_route_batch_endpoint_limits_size_and_concurrency(prompt_dir):
+    write_prompt(prompt_dir, "echo.md", "You echo.")
+    lp = LeanPrompt(
+        FastAPI(),
+        provider="openai",
+        prompt_dir=prompt_dir,
+        api_key="dummy_key",
+        batch_max_messages=5,
+        batch_concurrency=2,
+    )
+
+    class CountingProvider(FakeProvider):
+        active = peak = 0
+
+        async def generate(self, *args, **kwargs):
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            await asyncio.sleep(0.01)
+            self.active -= 1
+            return await super().generate(*args, **kwargs)
+
+    lp.provider = CountingProvider()
+
+    @lp.route("/echo", prompt_file="echo.md", cache=False, batch=True)
+    async def echo(user_input: str):
+        pass
+
+    client = TestClient(lp.app)
+    response = client.post("/echo/batch", json={"messages": list("abcde")})
+    assert response.json() == list("abcde")
+    assert lp.provider.peak == 2
+
+    response = client.post("/echo/batch", json={"messages": list("abcdef")})
+    assert response.status_code == 413
+    assert len(lp.provider.calls) == 5
@@ -63,6 +63,14 @@ def create_app():
     return app
 
 
+def receive_final(websocket):
+    """Skips streamed partial frames and returns the final (complete) frame."""
+    while True:
+        frame = websocket.receive_json()
+        if not frame.get("partial"):
+            return frame
+
+
 # --- Integration Tests (Client) ---
 # ... (previous imports)
 from leanprompt.providers.openai import OpenAIProvider
@@ -99,7 +107,7 @@ async def test_websocket_routing_and_context():
         # Expected behavior: The LLM should follow add.md instructions (Calculator, JSON output)
         req_add = {"path": "/add", "message": "10 + 20"}
         websocket.send_json(req_add)
-        resp_add = websocket.receive_json()
+        resp_add = receive_final(websocket)
         print(f"\n[WS Add] {resp_add}")
 
         # Validation: Check if response contains correct sum in JSON format
@@ -111,7 +119,7 @@ async def test_websocket_routing_and_context():
         # 2. Request to /multiply path (Multiply Prompt)
         req_mult = {"path": "/multiply", "message": "5 * 5"}
         websocket.send_json(req_mult)
-        resp_mult = websocket.receive_json()
+        resp_mult = receive_final(websocket)
         print(f"[WS Mult] {resp_mult}")
         assert "25" in resp_mult["response"]
         assert resp_mult["path"] == "/multiply"
@@ -121,7 +129,7 @@ async def test_websocket_routing_and_context():
         # Turn 1
         req_chat1 = {"path": "/test_markdown", "message": "apple, banana, cherry"}
         websocket.send_json(req_chat1)
-        resp_chat1 = websocket.receive_json()
+        resp_chat1 = receive_final(websocket)
         print(f"[WS Chat 1] {resp_chat1}")
         assert resp_chat1["path"] == "/test_markdown"
 
@@ -129,7 +137,7 @@ async def test_websocket_routing_and_context():
         # We ask something referring to previous context, e.g., "What color are they?"
         req_chat2 = {"path": "/test_markdown", "message": "What color are they?"}
         websocket.send_json(req_chat2)
-        resp_chat2 = websocket.receive_json()
+        resp_chat2 = receive_final(websocket)
         print(f"[WS Chat 2] {resp_chat2}")
         assert resp_chat2["path"] == "/test_markdown"
 
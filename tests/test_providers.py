@@ -0,0 +1,216 @@
+import json
+import asyncio
+import httpx
+import pytest
+from leanprompt.providers.openai import OpenAIProvider
+from leanprompt.providers.deepseek import DeepSeekProvider
+from leanprompt.providers.google import GoogleProvider
+from leanprompt.providers.ollama import OllamaProvider
+
+# --- Helpers ---
+
+
+class ChunkedStream(httpx.AsyncByteStream):
+    """Replays `body` in fixed-size pieces to exercise chunk boundaries."""
+
+    def __init__(self, body: bytes, chunk_size: int):
+        self.body = body
+        self.chunk_size = chunk_size
+
+    async def __aiter__(self):
+        for i in range(0, len(self.body), self.chunk_size):
+            yield self.body[i : i + self.chunk_size]
+
+
+def mock_client(body: bytes, requests: list = None, chunk_size: int = None):
+    """Shared client whose transport answers every request with `body`."""
+
+    def handler(request: httpx.Request):
+        if requests is not None:
+            requests.append(request)
+        if chunk_size:
+            return httpx.Response(200, stream=ChunkedStream(body, chunk_size))
+        return httpx.Response(200, content=body)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def collect(agen):
+    return [chunk async for chunk in agen]
+
+
+# --- OpenAI-compatible ---
+
+
+@pytest.mark.asyncio
+async def test_openai_generate_uses_shared_client():
+    requests = []
+    body = json.dumps({"choices": [{"message": {"content": "hi"}}]}).encode()
+    provider = OpenAIProvider(api_key="key", http_client=mock_client(body, requests))
+
+    result = await provider.generate("sys", "hello", model="m")
+
+    assert result == "hi"
+    sent = json.loads(requests[0].content)
+    assert sent["model"] == "m"
+    assert sent["messages"] == [
+        {"role": "system", "content": "sys"},
+        {"role": "user", "content": "hello"},
+    ]
+    assert requests[0].headers["authorization"] == "Bearer key"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [None, 1, 5])
+async def test_openai_generate_stream(chunk_size):
+    lines = [
+        'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+        'data: {"choices": [{"delta": null}]}',
+        "data: [1, 2]",
+        'data: {"choices": [{"delta": {"content": "Hel"}}]}',
+        'data: {"choices": [{"delta": {"content": "lo"}}]}',
+        "data: [DONE]",
+    ]
+    body = ("\n\n".join(lines) + "\n\n").encode()
+    requests = []
+    client = mock_client(body, requests, chunk_size=chunk_size)
+    provider = OpenAIProvider(api_key="key", http_client=client)
+
+    chunks = await collect(provider.generate_stream("sys", "hello"))
+
+    assert "".join(chunks) == "Hello"
+    assert requests[0].headers["accept-encoding"] == "identity"
+    if chunk_size is None:
+        # Tokens that arrive in the same read are yielded together
+        assert chunks == ["Hello"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [None, 3])
+async def test_deepseek_generate_stream(chunk_size):
+    lines = [
+        'data: {"choices": [{"delta": {"content": "Hel"}}]}',
+        ": keep-alive",
+        'data: {"choices": [{"delta": {"content": "lo"}}]}',
+        "data: [DONE]",
+        'data: {"choices": [{"delta": {"content": "ignored"}}]}',
+    ]
+    body = ("\r\n\r\n".join(lines) + "\r\n\r\n").encode()
+    client = mock_client(body, chunk_size=chunk_size)
+    provider = DeepSeekProvider(api_key="key", http_client=client)
+
+    chunks = await collect(provider.generate_stream("sys", "hello"))
+
+    assert "".join(chunks) == "Hello"
+
+
+# --- Google ---
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [None, 1, 7])
+async def test_google_generate_stream(chunk_size):
+    objs = [
+        {"candidates": [{"content": {"parts": [{"text": "Hel"}]}}]},
+        {"usageMetadata": {"promptTokenCount": 3}},
+        {"candidates": [{"content": {"parts": [{"text": 'lo {"é"}'}]}}]},
+    ]
+    body = (
+        "[" + ",\r\n".join(json.dumps(o, ensure_ascii=False) for o in objs) + "]"
+    ).encode()
+    client = mock_client(body, chunk_size=chunk_size)
+    provider = GoogleProvider(api_key="key", http_client=client)
+
+    chunks = await collect(provider.generate_stream("sys", "hello"))
+
+    assert "".join(chunks) == 'Hello {"é"}'
+
+
+@pytest.mark.asyncio
+async def test_google_generate_sends_encoded_payload():
+    requests = []
+    body = json.dumps({"candidates": [{"content": {"parts": [{"text": "hi"}]}}]})
+    client = mock_client(body.encode(), requests)
+    provider = GoogleProvider(api_key="key", http_client=client)
+    history = [
+        {"role": "user", "content": "a"},
+        {"role": "assistant", "content": "b"},
+    ]
+
+    result = await provider.generate("sys", "hello", history, model="gemini-x")
+
+    assert result == "hi"
+    assert requests[0].url.path.endswith("/models/gemini-x:generateContent")
+    assert requests[0].headers["content-type"] == "application/json"
+    sent = json.loads(requests[0].content)
+    assert sent["system_instruction"] == {"parts": [{"text": "sys"}]}
+    assert [c["role"] for c in sent["contents"]] == ["user", "model", "user"]
+    assert sent["contents"][-1]["parts"] == [{"text": "hello"}]
+
+
+# --- Ollama ---
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [None, 4])
+async def test_ollama_generate_stream(chunk_size):
+    records = [
+        {"message": {"content": "Hel"}, "done": False},
+        {"message": {"content": "lo"}, "done": False},
+        {"message": {"content": ""}, "done": True},
+    ]
+    body = "\n".join(json.dumps(r) for r in records).encode()
+    provider = OllamaProvider(http_client=mock_client(body, chunk_size=chunk_size))
+
+    chunks = await collect(provider.generate_stream("sys", "hello"))
+
+    assert "".join(chunks) == "Hello"
+
+
+@pytest.mark.asyncio
+async def test_provider_owns_lazily_created_client():
+    provider = OpenAIProvider(api_key="key")
+
+    client = provider._get_client()
+    assert provider._get_client() is client
+
+    await provider.aclose()
+    assert client.is_closed
+
+
+def test_provider_replaces_owned_client_per_event_loop():
+    provider = OpenAIProvider(api_key="key")
+
+    async def get_client():
+        client = provider._get_client()
+        assert provider._get_client() is client
+        return client
+
+    # Pooled connections cannot be reused once their loop has closed
+    first = asyncio.run(get_client())
+    second = asyncio.run(get_client())
+    assert second is not first
+
+    asyncio.run(provider.aclose())
+    assert provider._http is None
+
+
+@pytest.mark.asyncio
+async def test_provider_leaves_injected_client_open():
+    client = mock_client(b"")
+    provider = OpenAIProvider(api_key="key", http_client=client)
+
+    await provider.aclose()
+    assert not client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_collect_joins_streamed_chunks():
+    body = b'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\ndata: {"choices": [{"delta": {"content": "lo"}}]}\n\n'
+    provider = OpenAIProvider(
+        api_key="key", http_client=mock_client(body, chunk_size=1)
+    )
+
+    result = await provider.collect(provider.generate_stream("sys", "hello"))
+
+    assert result == "Hello"